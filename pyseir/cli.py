@@ -2,9 +2,14 @@ import sys
 import click
 import us
 import logging
+import matplotlib
+
+# Batch runs only write files, so never attach to a display.
+matplotlib.use('Agg')
+
 from pyseir.load_data import cache_all_data
 from pyseir.inference.initial_conditions_fitter import generate_start_times_for_state
-from pyseir.ensembles.ensemble_runner import run_state
+from pyseir.ensembles.ensemble_runner import run_state, generate_reports_for_state
 from pyseir.reports.state_report import StateReport
 from pyseir.inference import model_fitter_mle
 
@@ -54,6 +59,14 @@ def _run_ensembles(state=None):
             run_state(state, ensemble_kwargs={})
 
 
+def _generate_county_reports(state=None):
+    if state:
+        generate_reports_for_state(state)
+    else:
+        for state in us.states.STATES:
+            generate_reports_for_state(state.name)
+
+
 def _generate_state_reports(state=None):
     if state:
         report = StateReport(state.title())
@@ -71,6 +84,7 @@ def _run_all(state=None):
         _impute_start_dates(state.title())
         _run_mle_fits(state)
         _run_ensembles(state.title())
+        _generate_county_reports(state.title())
         _generate_state_reports(state.title())
     else:
         for state in us.states.STATES:
@@ -100,6 +114,12 @@ def run_ensembles(state):
     _run_ensembles(state)
 
 
+@entry_point.command()
+@click.option('--state', default='', help='State to generate files for. If no state is given, all states are computed.')
+def generate_county_reports(state):
+    _generate_county_reports(state)
+
+
 @entry_point.command()
 @click.option('--state', default='', help='State to generate files for. If no state is given, all states are computed.')
 def generate_state_report(state):
@@ -7,7 +7,7 @@ import copy
 from collections import defaultdict
 from functools import partial
 from multiprocessing.pool import Pool
-from pyseir.models.seir_model import SEIRModel
+from pyseir.models.seir_model import SEIRModel, integrate_ensemble
 from pyseir.parameters.parameter_ensemble_generator import ParameterEnsembleGenerator
 from pyseir.models.suppression_policies import generate_empirical_distancing_policy
 from pyseir import OUTPUT_DIR
@@ -23,6 +23,29 @@ compartment_to_capacity_attr_map = {
 }
 
 
+def _ensemble_output_file(county_metadata, fips, subdir, extension):
+    """
+    Path of an ensemble output file for a county.
+
+    Parameters
+    ----------
+    county_metadata: dict
+        County metadata containing the state and county names.
+    fips: str
+        County fips.
+    subdir: str
+        Output subdirectory, 'reports' or 'data'.
+    extension: str
+        File extension, e.g. 'pdf' or 'json'.
+
+    Returns
+    -------
+    : str
+    """
+    state, county = county_metadata['state'], county_metadata['county']
+    return os.path.join(OUTPUT_DIR, state, subdir, f"{state}__{county}__{fips}__ensemble_projections.{extension}")
+
+
 class EnsembleRunner:
     """
     The EnsembleRunner executes a collection of N_samples simulations based on
@@ -41,12 +64,26 @@ class EnsembleRunner:
     output_percentiles: list
         List of output percentiles desired. These will be computed for each
         compartment.
+    nproc: int
+        Number of processes used to run the ensemble members. Defaults to the
+        PYSEIR_INNER_NPROC environment variable if set, otherwise the number
+        of cpus. Use 1 when already running inside an outer process pool.
+    use_numba: bool
+        If True, integrate the whole ensemble with the compiled fixed step
+        RK4 solver instead of running odeint for each model. nproc then sets
+        the number of numba threads, so each county under run_state
+        integrates on a single thread.
+    seed: int
+        Seed for parameter sampling. None draws fresh entropy for each run.
     """
     def __init__(self, fips, n_years=2, n_samples=250,
                  suppression_policy=(0.35, 0.5, 0.75, 1),
                  skip_plots=False,
                  output_percentiles=(5, 25, 32, 50, 75, 68, 95),
-                 generate_report=True):
+                 generate_report=True,
+                 nproc=None,
+                 use_numba=False,
+                 seed=None):
 
         self.fips = fips
         self.t_list = np.linspace(0, 365 * n_years, 365 * n_years)
@@ -59,16 +96,18 @@ class EnsembleRunner:
         self.t0 = fit_results.load_t0(fips)
         self.date_generated = datetime.datetime.utcnow().isoformat()
         self.suppression_policy = suppression_policy
+        self.nproc = nproc or int(os.environ.get('PYSEIR_INNER_NPROC', os.cpu_count()))
+        self.use_numba = use_numba
+        self.seed = seed
 
         self.summary = copy.deepcopy(self.__dict__)
         self.summary.pop('t_list')
         self.generate_report = generate_report
 
         self.all_outputs = {}
-        self.output_file_report = os.path.join(OUTPUT_DIR, self.county_metadata['state'], 'reports',
-            f"{self.county_metadata['state']}__{self.county_metadata['county']}__{self.fips}__ensemble_projections.pdf")
-        self.output_file_data = os.path.join( OUTPUT_DIR, self.county_metadata['state'], 'data',
-            f"{self.county_metadata['state']}__{self.county_metadata['county']}__{self.fips}__ensemble_projections.json")
+        self.output_file_report = _ensemble_output_file(self.county_metadata, self.fips, 'reports', 'pdf')
+        self.output_file_data = _ensemble_output_file(self.county_metadata, self.fips, 'data', 'json')
+        self.output_file_arrays = self.output_file_data.replace('.json', '.npz')
 
     @staticmethod
     def _run_single_simulation(parameter_set):
@@ -94,25 +133,44 @@ class EnsembleRunner:
         Run an ensemble of models for each suppression policy nad generate the
         output report / results dataset.
         """
-
-        for suppression_policy in self.suppression_policy:
-            logging.info(f'Generating For Policy {suppression_policy}')
-
-            parameter_ensemble = ParameterEnsembleGenerator(
-                fips=self.fips,
-                N_samples=self.n_samples,
-                t_list=self.t_list,
-                suppression_policy=generate_empirical_distancing_policy(
+        parameter_generator = ParameterEnsembleGenerator(
+            fips=self.fips,
+            N_samples=self.n_samples,
+            t_list=self.t_list,
+            suppression_policy=None,
+            seed=self.seed)
+
+        # Share one worker pool across all suppression policies.
+        pool = Pool(processes=self.nproc) if self.nproc > 1 and not self.use_numba else None
+        try:
+            for suppression_policy in self.suppression_policy:
+                logging.info(f'Generating For Policy {suppression_policy}')
+
+                # The policy is the same for every sample, so tabulate it once.
+                parameter_generator.suppression_policy = generate_empirical_distancing_policy(
                     t_list=self.t_list,
                     fips=self.fips,
                     future_suppression=suppression_policy
-                )).sample_seir_parameters()
-
-            model_ensemble = list(map(self._run_single_simulation, parameter_ensemble))
-
-            logging.info(f'Generating Report for suppression policy {suppression_policy}')
-            self.all_outputs[f'suppression_policy__{suppression_policy}'] = \
-                self._generate_output_for_suppression_policy(model_ensemble, suppression_policy)
+                )(self.t_list)
+
+                parameter_ensemble = parameter_generator.sample_seir_parameters()
+
+                if self.use_numba:
+                    model_ensemble = integrate_ensemble([SEIRModel(**parameter_set) for parameter_set in parameter_ensemble],
+                                                        n_threads=self.nproc)
+                elif pool is not None:
+                    chunksize = max(1, len(parameter_ensemble) // (4 * self.nproc))
+                    model_ensemble = pool.map(self._run_single_simulation, parameter_ensemble, chunksize=chunksize)
+                else:
+                    model_ensemble = list(map(self._run_single_simulation, parameter_ensemble))
+
+                logging.info(f'Generating Report for suppression policy {suppression_policy}')
+                self.all_outputs[f'suppression_policy__{suppression_policy}'] = \
+                    self._generate_output_for_suppression_policy(model_ensemble, suppression_policy)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         if self.generate_report:
             report = CountyReport(self.fips,
@@ -122,8 +180,33 @@ class EnsembleRunner:
                                   summary=self.summary)
             report.generate_and_save()
 
+        self._write_outputs()
+
+    def _write_outputs(self):
+        """
+        Write the ensemble outputs to disk. Scalars such as the peak
+        statistics go to the json file, while arrays (t_list, confidence
+        intervals, capacities and surge windows) are stored in a compressed
+        npz keyed by e.g. 'suppression_policy__0.5/HICU/ci_50'. Use
+        load_data.load_ensemble_results to recombine them. The run summary is
+        stored in the json under 'summary', see load_data.load_ensemble_summary.
+        """
+        scalars = defaultdict(dict)
+        arrays = dict()
+        for policy, outputs in self.all_outputs.items():
+            for key, value in outputs.items():
+                if not isinstance(value, dict):
+                    arrays[f'{policy}/{key}'] = np.asarray(value)
+                    continue
+                for name, compartment_value in value.items():
+                    if np.ndim(compartment_value) > 0:
+                        arrays[f'{policy}/{key}/{name}'] = np.asarray(compartment_value)
+                    else:
+                        scalars[policy].setdefault(key, {})[name] = compartment_value
+
         with open(self.output_file_data, 'w') as f:
-            json.dump(self.all_outputs, f)
+            json.dump(dict(scalars, summary=self.summary), f, default=_to_json_serializable)
+        np.savez_compressed(self.output_file_arrays, **arrays)
 
     @staticmethod
     def _generate_compartment_arrays(model_ensemble):
@@ -141,25 +224,22 @@ class EnsembleRunner:
         value_stack: array[n_samples, time steps]
             Array with the stacked model output results.
         """
-        compartments = {key: [] for key in model_ensemble[0].results.keys() if key not in ('t_list')}
-
-        for model in model_ensemble:
-            for key in compartments:
-                compartments[key].append(model.results[key])
-
-        return {key: np.vstack(value_stack) for key, value_stack in compartments.items()}
+        stacked = np.stack([model.results_array for model in model_ensemble])
+        return {compartment: stacked[:, i] for compartment, i in model_ensemble[0].compartment_index.items()}
 
     @staticmethod
-    def _get_surge_window(model_ensemble, compartment):
+    def _get_surge_window(value_stack, capacities, t_list):
         """
         Calculate the list of surge window starts and ends for an ensemble.
 
         Parameters
         ----------
-        model_ensemble: list(SEIRModel)
-            List of models to compute the surge windows for.
-        compartment: str
-            Compartment to calculate the surge window over.
+        value_stack: array[n_samples, time steps]
+            Array with the stacked model output results for the compartment.
+        capacities: array[n_samples]
+            Capacity of the compartment for each model in the ensemble.
+        t_list: array
+            Array of timesteps.
 
         Returns
         -------
@@ -170,17 +250,16 @@ class EnsembleRunner:
             For each model, the surge end window time (since beginning of
             simulation). NaN implies no surge occurred.
         """
-        surge_start = []
-        surge_end = []
-        for m in model_ensemble:
-            # Find the first t where overcapacity occurs
-            surge_start_idx = np.argwhere(m.results[compartment] > getattr(m, compartment_to_capacity_attr_map[compartment]))
-            surge_start.append(m.t_list[surge_start_idx[0][0]] if len(surge_start_idx) > 0 else float('NaN'))
+        t_list = np.asarray(t_list)
+        over_capacity = value_stack > np.asarray(capacities)[:, None]
+        any_surge = over_capacity.any(axis=1)
 
-            # Reverse the t-list and capacity and do the same.
-            surge_end_idx = np.argwhere(m.results[compartment][::-1] > getattr(m, compartment_to_capacity_attr_map[compartment]))
-            surge_end.append(m.t_list[::-1][surge_end_idx[0][0]] if len(surge_end_idx) > 0 else float('NaN'))
+        # First and last t where overcapacity occurs.
+        surge_start_idx = over_capacity.argmax(axis=1)
+        surge_end_idx = over_capacity.shape[1] - 1 - over_capacity[:, ::-1].argmax(axis=1)
 
+        surge_start = np.where(any_surge, t_list[surge_start_idx], np.nan)
+        surge_end = np.where(any_surge, t_list[surge_end_idx], np.nan)
         return surge_start, surge_end
 
     def _detect_peak_time_and_value(self, value_stack, t_list):
@@ -204,13 +283,16 @@ class EnsembleRunner:
             Also add peak_value_mean.
         """
         peak_indices = value_stack.argmax(axis=1)
-        peak_times = [t_list[peak_index] for peak_index in peak_indices]
-        values_at_peak_index = [val[idx] for val, idx in zip(value_stack, peak_indices)]
+        peak_times = np.asarray(t_list)[peak_indices]
+        values_at_peak_index = np.take_along_axis(value_stack, peak_indices[:, None], axis=1).ravel()
+
+        peak_values = np.percentile(values_at_peak_index, self.output_percentiles)
+        peak_time_values = np.percentile(peak_times, self.output_percentiles)
 
         peak_data = dict()
-        for percentile in self.output_percentiles:
-            peak_data['peak_value_ci%i' % percentile] = np.percentile(values_at_peak_index, percentile).tolist()
-            peak_data['peak_time_ci%i' % percentile] = np.percentile(peak_times, percentile).tolist()
+        for percentile, peak_value, peak_time in zip(self.output_percentiles, peak_values, peak_time_values):
+            peak_data['peak_value_ci%i' % percentile] = peak_value.tolist()
+            peak_data['peak_time_ci%i' % percentile] = peak_time.tolist()
 
         peak_data['peak_value_mean'] = np.mean(values_at_peak_index).tolist()
         return peak_data
@@ -228,10 +310,13 @@ class EnsembleRunner:
 
         Returns
         -------
-
+        outputs: dict
+            Confidence intervals, peaks and surge windows for each compartment.
+            Arrays are kept as ndarrays and only converted when serialized.
         """
         outputs = defaultdict(dict)
-        outputs['t_list'] = model_ensemble[0].t_list.tolist()
+        outputs['t_list'] = np.asarray(model_ensemble[0].t_list)
+        ci_keys = ['ci_%i' % percentile for percentile in self.output_percentiles]
 
         # ------------------------------------------
         # Calculate Confidence Intervals and Peaks
@@ -239,13 +324,16 @@ class EnsembleRunner:
         for compartment, value_stack in self._generate_compartment_arrays(model_ensemble).items():
             compartment_output = dict()
 
-            # Compute percentiles over the ensemble
-            for percentile in self.output_percentiles:
-                outputs[compartment]['ci_%i' % percentile] = np.percentile(value_stack, percentile, axis=0).tolist()
+            # Compute percentiles over the ensemble in a single pass.
+            # Rows are views into a single (n_percentiles, time steps) array.
+            percentile_values = np.percentile(value_stack, self.output_percentiles, axis=0)
+            outputs[compartment].update(zip(ci_keys, percentile_values))
 
             if compartment in compartment_to_capacity_attr_map:
-                compartment_output['surge_start'], compartment_output['surge_start'] = self._get_surge_window(model_ensemble, compartment)
-                compartment_output['capacity'] = [getattr(m, compartment_to_capacity_attr_map[compartment]) for m in model_ensemble]
+                capacities = np.array([getattr(m, compartment_to_capacity_attr_map[compartment]) for m in model_ensemble])
+                compartment_output['surge_start'], compartment_output['surge_end'] = \
+                    self._get_surge_window(value_stack, capacities, outputs['t_list'])
+                compartment_output['capacity'] = capacities
 
             compartment_output.update(self._detect_peak_time_and_value(value_stack, outputs['t_list']))
 
@@ -255,6 +343,18 @@ class EnsembleRunner:
         return outputs
 
 
+def _to_json_serializable(obj):
+    """
+    Convert numpy values and datetimes to builtin types at the json
+    serialization boundary.
+    """
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
 def _run_county(fips, ensemble_kwargs):
     """
     Execute the ensemble runner for a specific county.
@@ -279,11 +379,60 @@ def run_state(state, ensemble_kwargs):
     state: str
         State to run against.
     ensemble_kwargs: dict
-        Kwargs passed to the EnsembleRunner object.
+        Kwargs passed to the EnsembleRunner object. Each county always runs
+        its ensemble serially since counties are already distributed over a
+        process pool, whose daemonic workers cannot start their own pools.
+        County reports are skipped unless generate_report is given; see
+        generate_reports_for_state.
     """
+    ensemble_kwargs = dict(ensemble_kwargs)
+    if ensemble_kwargs.setdefault('nproc', 1) > 1:
+        raise ValueError('nproc > 1 is not supported by run_state: counties already run on a process pool.')
+    ensemble_kwargs.setdefault('generate_report', False)
     df = load_data.load_county_metadata()
     all_fips = df[df['state'].str.lower() == state.lower()].fips
-    p = Pool()
     f = partial(_run_county, ensemble_kwargs=ensemble_kwargs)
-    p.map(f, all_fips)
-    p.close()
+    chunksize = max(1, len(all_fips) // (4 * os.cpu_count()))
+    # Recycle workers periodically to bound memory growth over long sweeps.
+    # Warm the data caches first so recycled (forked) workers inherit them,
+    # and in each worker in case processes are spawned instead.
+    load_data.preload_cached_data()
+    with Pool(maxtasksperchild=8, initializer=load_data.preload_cached_data) as p:
+        list(p.imap_unordered(f, all_fips, chunksize=chunksize))
+
+
+def _generate_county_report(fips):
+    """
+    Generate the county report from previously saved ensemble outputs, using
+    the summary recorded when the ensemble ran.
+
+    Parameters
+    ----------
+    fips: str
+        County fips.
+    """
+    county_metadata = load_data.load_county_metadata_by_fips(fips)
+    report = CountyReport(fips,
+                          model_ensemble=None,
+                          county_outputs=load_data.load_ensemble_results(fips),
+                          filename=_ensemble_output_file(county_metadata, fips, 'reports', 'pdf'),
+                          summary=load_data.load_ensemble_summary(fips))
+    report.generate_and_save()
+
+
+def generate_reports_for_state(state):
+    """
+    Generate county reports for each county in a state from the outputs
+    written by run_state.
+
+    Parameters
+    ----------
+    state: str
+        State to generate reports for.
+    """
+    df = load_data.load_county_metadata()
+    all_fips = df[df['state'].str.lower() == state.lower()].fips
+    chunksize = max(1, len(all_fips) // (4 * os.cpu_count()))
+    load_data.preload_cached_data()
+    with Pool(maxtasksperchild=8, initializer=load_data.preload_cached_data) as p:
+        list(p.imap_unordered(_generate_county_report, all_fips, chunksize=chunksize))
@@ -4,7 +4,6 @@ import os
 import logging
 import numpy as np
 import pandas as pd
-import iminuit
 from sklearn.linear_model import LinearRegression, BayesianRidge
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import cross_validate
@@ -35,15 +34,19 @@ class InitialConditionsFitter:
     start_days_after_t0: int
         After we find the time of t0_case_count, filter observations
         occurring more than this many days after.
+    use_minuit: bool
+        If True, minimize the reduced chi2 with iminuit's migrad rather than
+        using the closed form weighted least squares fit to log(cases).
     """
 
     def __init__(self, fips, t0_case_count=1, start_days_before_t0=2,
-                 start_days_after_t0=1000, min_days_required=5):
+                 start_days_after_t0=1000, min_days_required=5, use_minuit=False):
 
         self.t0_case_count = t0_case_count
         self.start_days_before_t0 = start_days_before_t0
         self.start_days_after_t0 = start_days_after_t0
         self.min_days_required = min_days_required
+        self.use_minuit = use_minuit
 
         # Load case data
         case_data = load_data.load_county_case_data()
@@ -103,19 +106,34 @@ class InitialConditionsFitter:
         Determine the initial conditions by fitting an exponential to a set of
         observations.
 
+        The exponential is linear in log space, log(y) = (t - t0) / scale
+        when norm=1 (norm and t0 are degenerate), so it is fit by least
+        squares on log(y) with sqrt(y) weights approximating Poisson errors.
+
         Returns
         -------
         : dict
             Fit parameters norm, t0, scale.
         """
-        x0 = dict(norm=1, t0=5, scale=20, error_norm=.01, error_t0=.1, error_scale=.01)
-        m = iminuit.Minuit(self.exponential_loss, **x0, errordef=0.5)
-        fit = m.migrad()
-        return {val['name']: val['value'] for val in fit.params}
+        if self.use_minuit:
+            import iminuit
+            x0 = dict(norm=1, t0=5, scale=20, error_norm=.01, error_t0=.1, error_scale=.01)
+            m = iminuit.Minuit(self.exponential_loss, **x0, errordef=0.5)
+            fit = m.migrad()
+            return {val['name']: val['value'] for val in fit.params}
+
+        mask = self.y > 0
+        if mask.sum() < 2:
+            raise ValueError(f'Only {mask.sum()} non-zero observations for county. Cannot fit.')
+        slope, intercept = np.polyfit(self.t[mask], np.log(self.y[mask]), 1, w=np.sqrt(self.y[mask]))
+        if not np.isfinite(slope) or slope <= 0:
+            raise ValueError(f'Case counts for county are not growing (slope={slope}). Cannot fit.')
+        scale = 1 / slope
+        return dict(norm=1.0, t0=-intercept * scale, scale=scale)
 
     def fit(self):
         """
-        Use the migrad algorithm to minimize chi2 over the dataset.
+        Fit the exponential model to the dataset.
         """
         logging.info(f'Fitting {self.county}, {self.state} Initial Conditions')
         self.model_params = self.fit_county_initial_conditions()
@@ -156,7 +174,7 @@ class InitialConditionsFitter:
         plt.legend()
 
 
-def generate_start_times_for_state(state):
+def generate_start_times_for_state(state, run_model_selection=False):
     """
     Generate imputed start dates for each county.
 
@@ -164,6 +182,9 @@ def generate_start_times_for_state(state):
     ----------
     state: str
         State to model counties of.
+    run_model_selection: bool
+        If True, log cross validated r2 scores for a few candidate regressors
+        before imputing with BayesianRidge.
     """
     metadata = load_data.load_county_metadata()
     state_dir = os.path.join(OUTPUT_DIR, state)
@@ -208,22 +229,25 @@ def generate_start_times_for_state(state):
     samples_with_data = merged['days_from_2020_01_01'].notnull()
     samples_with_no_data = merged['days_from_2020_01_01'].isnull()
 
-    X = np.log(merged[['population_density', 'housing_density', 'total_population']][samples_with_data])
-    X_predict = np.log(merged[['population_density', 'housing_density', 'total_population']][samples_with_no_data])
+    feature_cols = ['population_density', 'housing_density', 'total_population']
+    X = np.log(merged.loc[samples_with_data, feature_cols].to_numpy(dtype=float))
+    X_predict = np.log(merged.loc[samples_with_no_data, feature_cols].to_numpy(dtype=float))
+    y = merged.loc[samples_with_data, 'days_from_2020_01_01'].to_numpy()
 
     # Test a few regressions
-    for estimator in [LinearRegression(), RandomForestRegressor(), BayesianRidge()]:
-        cv_result = cross_validate(estimator, X=X, y=merged['days_from_2020_01_01'][samples_with_data], scoring='r2', cv=4)
-        logging.info(f'{estimator.__class__.__name__} CV r2: {cv_result["test_score"].mean()}')
+    if run_model_selection:
+        for estimator in [LinearRegression(), RandomForestRegressor(n_estimators=50, n_jobs=-1), BayesianRidge()]:
+            cv_result = cross_validate(estimator, X=X, y=y, scoring='r2', cv=4, n_jobs=-1)
+            logging.info(f'{estimator.__class__.__name__} CV r2: {cv_result["test_score"].mean()}')
 
     # Train best model and impute the missing times.
     best_model = BayesianRidge()
-    best_model.fit(X=X, y=merged['days_from_2020_01_01'][samples_with_data])
+    best_model.fit(X=X, y=y)
 
     if samples_with_no_data.values.any():
-        merged.loc[samples_with_no_data, 'days_from_2020_01_01'] = best_model.predict(X_predict)
-        merged.loc[samples_with_no_data, 't0_date'] = datetime.fromisoformat('2020-01-01') \
-                                                      + np.array([timedelta(days=t) for t in best_model.predict(X_predict)])
+        predicted_days = best_model.predict(X_predict)
+        merged.loc[samples_with_no_data, 'days_from_2020_01_01'] = predicted_days
+        merged.loc[samples_with_no_data, 't0_date'] = pd.Timestamp('2020-01-01') + pd.to_timedelta(predicted_days, unit='D')
 
     # Plot doubling time by population density
     merged.loc[samples_with_no_data, 'imputed_start_time'] = True
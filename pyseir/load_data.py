@@ -8,6 +8,8 @@ import re
 import io
 import zipfile
 import json
+from datetime import datetime
+from functools import lru_cache
 from pyseir import OUTPUT_DIR
 
 
@@ -56,6 +58,7 @@ def cache_county_case_data():
     county_case_data[['cases', 'deaths']] = county_case_data[['cases', 'deaths']].astype(int)
     county_case_data = county_case_data[county_case_data['fips'].notnull()]
     county_case_data.to_pickle(os.path.join(DATA_DIR, 'covid_case_timeseries.pkl'))
+    _load_county_case_data.cache_clear()
 
 #### Deprecated
 # def cache_county_metadata():
@@ -107,6 +110,8 @@ def cache_hospital_beds():
     df.columns = [col.lower() for col in df.columns]
     df = df.drop(['objectid', 'state_fips', 'cnty_fips'], axis=1)
     df.to_pickle(os.path.join(DATA_DIR, 'icu_capacity.pkl'))
+    _load_hospital_data.cache_clear()
+    _load_county_metadata_merged.cache_clear()
 
 
 def cache_mobility_data():
@@ -163,6 +168,51 @@ def cache_public_implementations_data():
     df.to_pickle(os.path.join(DATA_DIR, 'public_implementations_data.pkl'))
 
 
+# These datasets are read by every EnsembleRunner and ParameterEnsembleGenerator,
+# so parse each file at most once per process and hand out copies.
+@lru_cache(maxsize=1)
+def _load_county_case_data():
+    return pd.read_pickle(os.path.join(DATA_DIR, 'covid_case_timeseries.pkl'))
+
+
+@lru_cache(maxsize=1)
+def _load_county_metadata():
+    # return pd.read_pickle(os.path.join(DATA_DIR, 'covid_county_metadata.pkl'))
+    return pd.read_json(os.path.join(DATA_DIR, 'county_metadata.json'), dtype={'fips': 'str'})
+
+
+@lru_cache(maxsize=1)
+def _load_hospital_data():
+    return pd.read_pickle(os.path.join(DATA_DIR, 'icu_capacity.pkl'))
+
+
+@lru_cache(maxsize=1)
+def _load_county_metadata_merged():
+    """
+    County metadata merged with hospital capacity aggregated by fips, indexed
+    by fips.
+    """
+    # Not all counties have hospital data.
+    hospital_bed_data = _load_hospital_data()[
+        ['fips',
+         'num_licensed_beds',
+         'num_staffed_beds',
+         'num_icu_beds',
+         'bed_utilization',
+         'potential_increase_in_bed_capac']].groupby('fips').sum()
+    return _load_county_metadata().merge(hospital_bed_data, on='fips', how='left').set_index('fips')
+
+
+def preload_cached_data():
+    """
+    Populate the in-process caches for the county metadata, case data and
+    hospital data. Calling this before creating a fork based process pool
+    lets every worker, including recycled ones, inherit the parsed data.
+    """
+    _load_county_case_data()
+    _load_county_metadata_merged()
+
+
 def load_county_case_data():
     """
     Return county level case data. The following columns:
@@ -171,7 +221,7 @@ def load_county_case_data():
     -------
     : pd.DataFrame
     """
-    return pd.read_pickle(os.path.join(DATA_DIR, 'covid_case_timeseries.pkl'))
+    return _load_county_case_data().copy()
 
 
 def load_county_metadata():
@@ -183,13 +233,40 @@ def load_county_metadata():
     : pd.DataFrame
 
     """
-    # return pd.read_pickle(os.path.join(DATA_DIR, 'covid_county_metadata.pkl'))
-    return pd.read_json(os.path.join(DATA_DIR, 'county_metadata.json'), dtype={'fips': 'str'})
+    return _load_county_metadata().copy()
+
+
+def _ensemble_results_path(fips):
+    county_metadata = load_county_metadata().set_index('fips')
+    state, county = county_metadata.loc[fips]['state'], county_metadata.loc[fips]['county']
+    return os.path.join(OUTPUT_DIR, state, 'data', f"{state}__{county}__{fips}__ensemble_projections.json")
+
+
+def load_ensemble_summary(fips):
+    """
+    Retrieve the summary of the ensemble run for a county, as recorded when
+    the ensemble was executed.
+
+    Parameters
+    ----------
+    fips: str
+        County FIPS to load.
+
+    Returns
+    -------
+    summary: dict
+        EnsembleRunner summary, with t0 restored to a datetime.
+    """
+    with open(_ensemble_results_path(fips)) as f:
+        summary = json.load(f)['summary']
+    summary['t0'] = datetime.fromisoformat(summary['t0'])
+    return summary
 
 
 def load_ensemble_results(fips):
     """
-    Retrieve
+    Retrieve the ensemble results for a county, merging the scalar outputs
+    from the json file with the arrays stored in the accompanying npz.
 
     Parameters
     ----------
@@ -200,11 +277,20 @@ def load_ensemble_results(fips):
     -------
     ensemble_results: dict
     """
-    county_metadata = load_county_metadata().set_index('fips')
-    state, county = county_metadata.loc[fips]['state'], county_metadata.loc[fips]['county']
-    path = os.path.join(OUTPUT_DIR, state, 'data', f"{state}__{county}__{fips}__ensemble_projections.json")
+    path = _ensemble_results_path(fips)
     with open(path) as f:
         fit_results = json.load(f)
+    fit_results.pop('summary', None)
+
+    path_arrays = path.replace('.json', '.npz')
+    if os.path.exists(path_arrays):
+        with np.load(path_arrays) as arrays:
+            for key in arrays.files:
+                *parents, name = key.split('/')
+                node = fit_results
+                for parent in parents:
+                    node = node.setdefault(parent, {})
+                node[name] = arrays[key]
     return fit_results
 
 
@@ -227,20 +313,7 @@ def load_county_metadata_by_fips(fips):
         'num_licensed_beds', 'num_staffed_beds', 'num_icu_beds',
         'bed_utilization', 'potential_increase_in_bed_capac']
     """
-    county_metadata = load_county_metadata()
-    hospital_bed_data = load_hospital_data()
-
-    # Not all counties have hospital data.
-    hospital_bed_data = hospital_bed_data[
-        ['fips',
-         'num_licensed_beds',
-         'num_staffed_beds',
-         'num_icu_beds',
-         'bed_utilization',
-         'potential_increase_in_bed_capac']].groupby('fips').sum()
-
-    county_metadata_merged = county_metadata.merge(hospital_bed_data, on='fips', how='left').set_index('fips').loc[fips].to_dict()
-    return county_metadata_merged
+    return _load_county_metadata_merged().loc[fips].to_dict()
 
 
 def load_new_case_data_by_fips(fips, t0):
@@ -280,7 +353,7 @@ def load_hospital_data():
     -------
     : pd.DataFrame
     """
-    return pd.read_pickle(os.path.join(DATA_DIR, 'icu_capacity.pkl'))
+    return _load_hospital_data().copy()
 
 
 def load_mobility_data_m50():
@@ -1,7 +1,37 @@
+import logging
 import numpy as np
 from scipy.integrate import odeint
 import matplotlib.pyplot as plt
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+if numba is not None:
+    _jit = numba.njit(fastmath=True, cache=True)
+    _parallel_jit = numba.njit(parallel=True, fastmath=True, cache=True)
+    _prange = numba.prange
+else:
+    _jit = _parallel_jit = lambda f: f
+    _prange = range
+
+
+# Row ordering of SEIRModel.results_array.
+COMPARTMENTS = (
+    'S', 'E', 'A', 'I', 'R', 'HGen', 'HICU', 'HVent', 'D',
+    'direct_deaths_per_day',
+    'deaths_from_hospital_bed_limits',
+    'deaths_from_icu_bed_limits',
+    'deaths_from_ventilator_limits',
+    'HGen_cumulative', 'HICU_cumulative', 'HVent_cumulative',
+    'total_deaths',
+    'total_new_infections',
+    'total_deaths_per_day',
+    'general_admissions_per_day',
+    'icu_admissions_per_day')
+
 
 class SEIRModel:
     """
@@ -214,6 +244,30 @@ class SEIRModel:
         # List of times to integrate.
         self.t_list = t_list
         self.results = None
+        self.results_array = None
+
+    # Maps compartment name to its row in results_array.
+    compartment_index = {name: i for i, name in enumerate(COMPARTMENTS)}
+
+    def __getstate__(self):
+        """
+        Drop the results entries that are views of results_array, since
+        pickle would otherwise serialize a copy of each one.
+        """
+        state = self.__dict__.copy()
+        if self.results_array is not None:
+            state['results'] = {key: value for key, value in self.results.items() if key not in self.compartment_index}
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore the pickled state and rebuild the results views into
+        results_array.
+        """
+        self.__dict__.update(state)
+        if state.get('results_array') is not None:
+            for compartment, i in self.compartment_index.items():
+                self.results[compartment] = self.results_array[i]
 
     def _time_step(self, y, t):
         """
@@ -297,14 +351,28 @@ class SEIRModel:
             'total_deaths':
         }
         """
-        # Initial conditions vector
+        # Integrate the SEIR equations over the time grid, t.
+        result_time_series = odeint(self._time_step, self._initial_conditions(), self.t_list, atol=1e-3, rtol=1e-3)
+        self._set_results(result_time_series)
+
+    def _initial_conditions(self):
+        """
+        Initial conditions vector, ordered as in _time_step.
+        """
         HAdmissions_general, HAdmissions_ICU, TotalAllInfections = 0, 0, 0
-        y0 = self.S_initial, self.E_initial, self.A_initial, self.I_initial, self.R_initial,\
-             self.HGen_initial, self.HICU_initial, self.HICUVent_initial, self.D_initial, \
-             HAdmissions_general, HAdmissions_ICU, TotalAllInfections
+        return self.S_initial, self.E_initial, self.A_initial, self.I_initial, self.R_initial,\
+               self.HGen_initial, self.HICU_initial, self.HICUVent_initial, self.D_initial, \
+               HAdmissions_general, HAdmissions_ICU, TotalAllInfections
 
-        # Integrate the SEIR equations over the time grid, t.
-        result_time_series = odeint(self._time_step, y0, self.t_list, atol=1e-3, rtol=1e-3)
+    def _set_results(self, result_time_series):
+        """
+        Populate the results dictionary from the integrated state.
+
+        Parameters
+        ----------
+        result_time_series: array[time steps, 12]
+            Integrated state vector for each timestep, ordered as in _time_step.
+        """
         S, E, A, I, R, HGen, HICU, HICUVent, D, HAdmissions_general, HAdmissions_ICU, TotalAllInfections = result_time_series.T
 
         # derivatives to get e.g. deaths per day or admissions per day.
@@ -348,6 +416,13 @@ class SEIRModel:
         self.results['general_admissions_per_day'] = np.append([0], HAdmissions_general[1:] - HAdmissions_general[:-1])
         self.results['icu_admissions_per_day'] = np.append([0], HAdmissions_ICU[1:] - HAdmissions_ICU[:-1])  # Derivative of the cumulative.
 
+        # Pack the compartments into a single array[compartments, time steps]
+        # and point the results entries at its rows.
+        self.results_array = np.empty((len(COMPARTMENTS), len(self.t_list)))
+        for i, compartment in enumerate(COMPARTMENTS):
+            self.results_array[i] = self.results[compartment]
+            self.results[compartment] = self.results_array[i]
+
 
 
     def plot_results(self, y_scale='log', xlim=None):
@@ -418,3 +493,144 @@ class SEIRModel:
         plt.xlabel('Time [days]', fontsize=12)
         plt.grid(True, which='both')
         return fig
+
+
+# Column layout of the parameter array consumed by _integrate_ensemble.
+_ENSEMBLE_PARAMETERS = (
+    'N', 'beta', 'kappa', 'gamma', 'sigma', 'delta',
+    'hospitalization_rate_general', 'hospitalization_rate_icu',
+    'symptoms_to_hospital_days', 'mortality_rate', 'symptoms_to_mortality_days',
+    'hospitalization_length_of_stay_general', 'hospitalization_length_of_stay_icu',
+    'fraction_icu_requiring_ventilator', 'hospitalization_length_of_stay_icu_and_ventilator')
+
+
+@_jit
+def _ensemble_time_step(y, rho, p, dydt):
+    """
+    Compiled version of SEIRModel._time_step writing the derivatives into
+    dydt. p holds the parameters in the order of _ENSEMBLE_PARAMETERS and rho
+    is the suppression level at this time.
+    """
+    N, beta, kappa, gamma, sigma, delta = p[0], p[1], p[2], p[3], p[4], p[5]
+    hospitalization_rate_general, hospitalization_rate_icu = p[6], p[7]
+    symptoms_to_hospital_days, mortality_rate, symptoms_to_mortality_days = p[8], p[9], p[10]
+    los_general, los_icu, fraction_icu_requiring_ventilator, los_icu_and_ventilator = p[11], p[12], p[13], p[14]
+
+    S, E, A, I, HNonICU, HICU, HICUVent = y[0], y[1], y[2], y[3], y[5], y[6], y[7]
+
+    number_exposed = beta * rho * S * (kappa * I + A) / N
+    exposed_and_symptomatic = gamma * sigma * E
+    exposed_and_asymptomatic = (1 - gamma) * sigma * E
+    asymptomatic_and_recovered = delta * A
+
+    infected_and_recovered_no_hospital = delta * I
+    infected_and_in_hospital_general = I * hospitalization_rate_general / symptoms_to_hospital_days
+    infected_and_in_hospital_icu = I * hospitalization_rate_icu / symptoms_to_hospital_days
+    infected_and_dead = I * mortality_rate / symptoms_to_mortality_days
+
+    recovered_after_hospital_general = HNonICU / los_general
+    recovered_after_hospital_icu = HICU * ((1 - fraction_icu_requiring_ventilator) / los_icu
+                                           + fraction_icu_requiring_ventilator / los_icu_and_ventilator)
+
+    dydt[0] = - number_exposed
+    dydt[1] = number_exposed - exposed_and_symptomatic - exposed_and_asymptomatic
+    dydt[2] = exposed_and_asymptomatic - asymptomatic_and_recovered
+    dydt[3] = exposed_and_symptomatic \
+              - infected_and_recovered_no_hospital \
+              - infected_and_in_hospital_general \
+              - infected_and_in_hospital_icu - infected_and_dead
+    dydt[4] = (asymptomatic_and_recovered
+               + infected_and_recovered_no_hospital
+               + recovered_after_hospital_general
+               + recovered_after_hospital_icu)
+    dydt[5] = infected_and_in_hospital_general - recovered_after_hospital_general
+    dydt[6] = infected_and_in_hospital_icu - recovered_after_hospital_icu
+    dydt[7] = infected_and_in_hospital_icu * fraction_icu_requiring_ventilator \
+              - HICUVent / los_icu_and_ventilator
+    dydt[8] = infected_and_dead
+    dydt[9] = infected_and_in_hospital_general
+    dydt[10] = infected_and_in_hospital_icu
+    dydt[11] = exposed_and_symptomatic + exposed_and_asymptomatic
+
+
+@_parallel_jit
+def _integrate_ensemble(params, y0, t_list, suppression, n_substeps):
+    """
+    Fixed step RK4 integration of every ensemble member over t_list. The
+    suppression level is linearly interpolated between timesteps.
+
+    Returns
+    -------
+    states: array[n_samples, time steps, 12]
+        Integrated state vectors, laid out as the odeint output per model.
+    """
+    n_samples, n_states = y0.shape
+    n_steps = t_list.shape[0]
+    states = np.empty((n_samples, n_steps, n_states))
+
+    for i in _prange(n_samples):
+        y = y0[i].copy()
+        y_tmp = np.empty(n_states)
+        k1 = np.empty(n_states)
+        k2 = np.empty(n_states)
+        k3 = np.empty(n_states)
+        k4 = np.empty(n_states)
+        states[i, 0] = y
+
+        for j in range(n_steps - 1):
+            dt = (t_list[j + 1] - t_list[j]) / n_substeps
+            d_rho = suppression[j + 1] - suppression[j]
+            for k in range(n_substeps):
+                rho_start = suppression[j] + d_rho * k / n_substeps
+                rho_mid = suppression[j] + d_rho * (k + 0.5) / n_substeps
+                rho_end = suppression[j] + d_rho * (k + 1) / n_substeps
+
+                _ensemble_time_step(y, rho_start, params[i], k1)
+                y_tmp[:] = y + 0.5 * dt * k1
+                _ensemble_time_step(y_tmp, rho_mid, params[i], k2)
+                y_tmp[:] = y + 0.5 * dt * k2
+                _ensemble_time_step(y_tmp, rho_mid, params[i], k3)
+                y_tmp[:] = y + dt * k3
+                _ensemble_time_step(y_tmp, rho_end, params[i], k4)
+                y += dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            states[i, j + 1] = y
+
+    return states
+
+
+def integrate_ensemble(model_ensemble, n_substeps=4, n_threads=None):
+    """
+    Integrate a collection of SEIR models sharing the same t_list and
+    suppression policy in a single compiled loop, instead of calling
+    SEIRModel.run() on each. Falls back to (slow) pure python if numba is not
+    installed.
+
+    Parameters
+    ----------
+    model_ensemble: list(SEIRModel)
+        Models to integrate. Their results are populated in place.
+    n_substeps: int
+        Number of RK4 steps taken between consecutive entries of t_list.
+    n_threads: int
+        Number of numba threads to integrate with. None uses numba's default
+        of one per cpu.
+
+    Returns
+    -------
+    model_ensemble: list(SEIRModel)
+        Executed models.
+    """
+    if numba is None:
+        logging.warning('numba is not installed. Integrating the ensemble in pure python.')
+    elif n_threads:
+        numba.set_num_threads(min(n_threads, numba.config.NUMBA_NUM_THREADS))
+
+    t_list = np.asarray(model_ensemble[0].t_list, dtype=np.float64)
+    suppression = np.asarray(model_ensemble[0].suppression_policy(t_list), dtype=np.float64)
+    params = np.array([[getattr(m, name) for name in _ENSEMBLE_PARAMETERS] for m in model_ensemble], dtype=np.float64)
+    y0 = np.array([m._initial_conditions() for m in model_ensemble], dtype=np.float64)
+
+    states = _integrate_ensemble(params, y0, t_list, suppression, n_substeps)
+    for model, result_time_series in zip(model_ensemble, states):
+        model._set_results(result_time_series)
+    return model_ensemble
@@ -21,6 +21,27 @@ distancing_measure_suppression = {
 }
 
 
+class TabulatedPolicy:
+    """
+    Suppression policy tabulated on a time grid. Evaluating a precomputed
+    table with np.interp is much cheaper than calling an interp1d at every
+    ODE step.
+
+    Parameters
+    ----------
+    t_list: array-like
+        List of times the policy is tabulated at.
+    values: array-like
+        Suppression level at each time in t_list.
+    """
+    def __init__(self, t_list, values):
+        self.t_list = np.asarray(t_list, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+    def __call__(self, t):
+        return np.interp(t, self.t_list, self.values)
+
+
 def generate_triggered_suppression_model(t_list, lockdown_days, open_days, reduction=0.25, start_on=0):
     """
     Generates a contact reduction model which switches a binary supression
@@ -16,8 +16,9 @@ class CountyReport:
     ----------
     fips: str
         County fips code.
-    model_ensemble: list(SEIRModel)
-        Models from the ensemble.
+    model_ensemble: list(SEIRModel) or None
+        Models from the ensemble. If None, e.g. when generating reports from
+        saved outputs, the sample model page is skipped.
     county_outputs: dict
         Dictionary of structure (in yaml syntax)
             suppression_policy__0.5:
@@ -81,9 +82,10 @@ class CountyReport:
             Limits in days since simulation start to plot.
         """
         # Add a sample model from the ensemble.
-        fig = self.model_ensemble[0].plot_results(xlim=xlim)
-        fig.suptitle(f'PySEIR COVID19 Estimates: {self.county_metadata["county"]} County, {self.county_metadata["state"]}. 'f'SAMPLE OF MODEL ENSEMBLE', fontsize=16)
-        self.report.add_figure(fig)
+        if self.model_ensemble:
+            fig = self.model_ensemble[0].plot_results(xlim=xlim)
+            fig.suptitle(f'PySEIR COVID19 Estimates: {self.county_metadata["county"]} County, {self.county_metadata["state"]}. 'f'SAMPLE OF MODEL ENSEMBLE', fontsize=16)
+            self.report.add_figure(fig)
 
         for suppression_policy, output in self.county_outputs.items():
             compartments = list(output.keys())
@@ -110,7 +112,7 @@ class CountyReport:
                 # Circular import :(
                 from pyseir.ensembles.ensemble_runner import compartment_to_capacity_attr_map
                 if compartment in compartment_to_capacity_attr_map:
-                    percentiles = np.percentile([getattr(m, compartment_to_capacity_attr_map[compartment]) for m in self.model_ensemble], (5, 32, 50, 68, 95))
+                    percentiles = np.percentile(output[compartment]['capacity'], (5, 32, 50, 68, 95))
                     plt.hlines(percentiles[2], *plt.xlim(), label='ICU Capacity', color='darkseagreen')
                     plt.hlines([percentiles[0], percentiles[4]], *plt.xlim(), color='darkseagreen', linestyles='-.', alpha=.4)
                     plt.hlines([percentiles[1], percentiles[3]], *plt.xlim(), color='darkseagreen', linestyles='--', alpha=.2)